@@ -7,21 +7,75 @@ Author: Jack Tiffany
 """
 
 import argparse
+import csv
+import sys
 from domain_auditor import dauditor
 
+def positive_int(text: str) -> int:
+    """
+    Argparse type for counts that must be at least 1
+
+    Parameters:
+    text (str): the argument as given on the command line
+
+    Returns:
+    int: The parsed count
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def read_domains(csv_path: str) -> list:
+    """
+    Reads the domains to audit from the first column of a CSV file, skipping blank rows
+
+    Parameters:
+    csv_path (str): path to the CSV file
+
+    Returns:
+    list: The domain names, in file order
+    """
+    with open(csv_path, newline="") as csv_file:
+        return [row[0].strip() for row in csv.reader(csv_file) if row and row[0].strip()]
+
+def print_result(result: dict) -> None:
+    """
+    Prints the validity of the SPF, DKIM, and DMARC entries of one audit_dns_records() result, along with the valid record or the reason it failed
+
+    Parameters:
+    result (dict): the audit result to print
+
+    Returns:
+    None
+    """
+    if result["SPF"][0]:
+        print(f"SPF\tVALID\n\t{result['SPF'][1]}")
+    else:
+        print(f"SPF\tINVALID\n\t{result['SPF'][1]}")
+    if result["DKIM"][0]:
+        for dkim in result['DKIM'][1]:
+            print(f"DKIM\tVALID\n\t{dkim}")
+    else:
+        print(f"DKIM\tINVALID\n\t{result['DKIM'][1]}")
+    if result["DMARC"][0]:
+        print(f"DMARC\tVALID\n\t{result['DMARC'][1]}")
+    else:
+        print(f"DMARC\tINVALID\n\t{result['DMARC'][1]}")
+
 def main():
     """
     Main function to make a DNS query for the DNS records of the specified domain, then checks to make sure SPF, DKIM, and DMARC are configured.
 
     Configure the target domain, if DKIM should be checked, and what selector/record type the DKIM uses. SPF and DMARC will be checked by default.
     """
-    COMMAND_LINE_MODE = False
+    COMMAND_LINE_MODE = len(sys.argv) > 1
 
     if COMMAND_LINE_MODE:
         parser = argparse.ArgumentParser(
                             prog="DAud",
                             description="Provides tools to audit your domain's security configurations")
-        parser.add_argument('domain_name', type=str, help='Domain name to audit. E.g. example.com')
+        parser.add_argument('domain_name', type=str, nargs='?', help='Domain name to audit. E.g. example.com')
         dkim_group = parser.add_argument_group('dkim_group')
         parser.add_argument('--spf', '-S', action='store_true', help='Audit SPF record')
         dkim_group.add_argument('--dkim', '-K', action='store_true', help='Audit DKIM record')
@@ -30,40 +84,33 @@ def main():
         parser.add_argument('--dmarc', '-D', action='store_true', help='Audit DMARC record')
         parser.add_argument('--all', '-A', action='store_true', help='Shorthand to audit SPF, DKIM, and DMARC records')
         parser.add_argument('--csv', type=str, help='Path to CSV of domains to parse and audit')
+        parser.add_argument('--concurrency', type=positive_int, default=256, help='Maximum number of audits in flight at a time when auditing a CSV of domains')
 
         args = parser.parse_args()
+        if args.domain_name is None and args.csv is None:
+            parser.error("a domain name or --csv is required")
+        domain = args.domain_name
+        selectors_string = args.dkim_selectors
+        dkim_type = args.dkim_record_type
     else:
         domain = input("Please enter domain name: ")
         selectors_string = input("Please enter comma separated list of DKIM selectors: ")
         dkim_type = input("Please enter record type for DKIM record: ")
 
     # normalizing input
-    selectors = selectors_string.replace(", ", ",").split(",")
+    selectors = [selector for selector in selectors_string.replace(", ", ",").split(",") if selector]
     dkim_type = dkim_type.upper()
 
     # EXAMPLE: auditor = dauditor('example.com', ['selector1', 'selector2'], 'TXT')
+    if COMMAND_LINE_MODE and args.csv is not None:
+        domains = read_domains(args.csv)
+        results = dauditor.audit_many(domains, {target: selectors for target in domains}, dkim_type, args.concurrency)
+        for target in domains:
+            print(target)
+            print_result(results[target])
+        return
     auditor = dauditor(domain, selectors, dkim_type)
-    result = auditor.audit_dns_records()
-    if result["SPF"][0][0]:
-        print(f"SPF\tVALID\n\t{result['SPF'][1][0]}")
-    elif len(result['SPF'][1]) == 0:
-        print(f"SPF\tINVALID\n\tNO RECORD FOUND")
-    else:
-        print(f"SPF\tINVALID\n\t{result['SPF'][1][0]}")
-    if result["DKIM"][0][0]:
-        for dkim in result['DKIM'][1]:
-            print(f"DKIM\tVALID\n\t{dkim}")
-    elif len(result['DKIM'][1]) == 0:
-        print(f"DKIM\tINVALID\n\tNO RECORD FOUND")
-    else:
-        for dkim in result['DKIM'][1]:
-            print(f"DKIM\tINVALID\n\t{dkim}")
-    if result["DMARC"][0][0]:
-        print(f"DMARC\tVALID\n\t{result['DMARC'][1][0]}")
-    elif len(result['DMARC'][1]) == 0:
-        print(f"DMARC\tINVALID\n\tNO RECORD FOUND")
-    else:
-        print(f"DMARC\tINVALID\n\t{result['DMARC'][1][0]}")
+    print_result(auditor.audit_dns_records())
     return
 
 if __name__ == "__main__":
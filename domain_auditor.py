@@ -1,8 +1,831 @@
+import asyncio
+import collections
+import collections.abc
+import os
 import re
+import selectors
+import socket
+import ssl
+import threading
+import time
+import dns.asyncquery
+import dns.asyncresolver
+import dns.entropy
 import dns.exception
+import dns.flags
+import dns.inet
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdataclass
 import dns.resolver
 import dns.rdatatype
-import base64
+
+try:
+    from blastdns import Client as BlastDNSClient, ClientConfig as BlastDNSConfig    # optional Rust resolver for bulk audits
+except ImportError:
+    BlastDNSClient = None
+    BlastDNSConfig = None
+
+FAST_RESOLVERS = ['8.8.8.8', '1.1.1.1', '9.9.9.9', '208.67.222.222']    # public resolvers run by different operators, so their slow paths rarely overlap
+REPLICATION_FACTOR = 2  # number of resolvers, fastest first, that every query is sent to
+RTT_SMOOTHING = 0.2     # weight given to the newest sample in each resolver's moving average round trip time
+NEGATIVE_TTL = 60       # seconds a nonexistent name is remembered for before it is queried again
+CACHE_SIZE = 10000      # most answers, and separately most nonexistent names, kept cached before the least recently used are evicted
+DKIM_CONCURRENCY = 32   # most selector lookups one audit keeps in flight, so a long list of guessed selectors can't flood the resolvers
+MULTI_QUESTION_QUERIES = False  # ask the target's own nameserver for every record in one multi-question packet, falling back if it refuses
+
+# each record type is identified by a fixed version tag at the very start of the raw TXT payload
+_SPF_PREFIX = b'v=spf1'
+_DKIM_PREFIX = b'v=DKIM1'
+_DMARC_PREFIX = b'v=DMARC1'
+# every validation pattern is compiled once at import instead of on every validation. SPF and DMARC are validated by a linear scan
+# over their terms/tags, each checked against a small flat pattern, so a malformed record can't send the regex engine backtracking
+# across the whole record. Groups are non-capturing, alternatives sharing a prefix have it factored out so no two branches can match
+# the same text, and re.ASCII keeps \w and \d to the ASCII classes the RFCs allow. Records are matched as the raw bytes off the wire,
+# and only the validated part is decoded
+# https://datatracker.ietf.org/doc/html/rfc7208#section-4.6.1
+_SPF_TERM_RE = re.compile(rb'[-~+?]?(?:ip4:\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?|ip6:[\da-fA-F:]+(?:/\d{1,2})?|(?:a|mx)(?::[\w-]+(?:\.[\w-]+)+)?|include:[\w-]+(?:\.[\w-]+)+|exists:\S+)|(?:redirect|exp)=[\w-][.\w-]+|[\w.-]+=\S+', re.ASCII)
+_SPF_ALL_RE = re.compile(rb'[-~+?]all')
+# https://datatracker.ietf.org/doc/html/rfc6376/
+_DKIM_VALIDATE_RE = re.compile(rb'v\s*=\s*DKIM1(?:\s*;\s*(?:[kh]\s*=\s*[\w:]+|p\s*=\s*[\w+/]+=*|s\s*=\s*(?:[\w:]+|\*)|t\s*=\s*\w+|n\s*=\s*\w+(?:\s+\w+)*))+\s*;?', re.ASCII)
+# https://datatracker.ietf.org/doc/html/rfc7489#section-6.4
+_DMARC_POLICY_RE = re.compile(rb'none|quarantine|reject')
+_DMARC_TAG_RES = {
+    b'sp': _DMARC_POLICY_RE,
+    b'rua': re.compile(rb'[^;]*'),
+    b'ruf': re.compile(rb'[^;]+'),
+    b'adkim': re.compile(rb'[rs]'),
+    b'aspf': re.compile(rb'[rs]'),
+    b'ri': re.compile(rb'\d+', re.ASCII),
+    b'fo': re.compile(rb'[01ds](?:\s*:\s*[01ds])*'),
+    b'rf': re.compile(rb'[a-zA-Z]+'),
+    b'pct': re.compile(rb'\d{3}', re.ASCII),
+}
+
+def _scan_spf(record: bytes) -> bytes:
+    """
+    Validates an SPF record term by term: the version, any number of mechanisms/modifiers, then an 'all' mechanism
+
+    Parameters:
+    record (bytes): the SPF record
+
+    Returns:
+    bytes: The record up to and including the 'all' mechanism, or None if it is invalid
+    """
+    if not _starts_with_tag(record, _SPF_PREFIX):    # rejects a malformed record before paying to split it
+        return None
+    terms = record.split(b' ')
+    if terms[0].lower() != _SPF_PREFIX:    # the version tag is case-insensitive, RFC 7208 section 4.5
+        return None
+    for index in range(1, len(terms)):
+        if _SPF_ALL_RE.fullmatch(terms[index]) is not None:
+            return b' '.join(terms[:index + 1])
+        if _SPF_TERM_RE.fullmatch(terms[index]) is None:
+            return None
+    return None
+
+def _dmarc_tag(tag: bytes) -> tuple:
+    """
+    Splits a DMARC tag into its name and value, ignoring whitespace around the '='
+
+    Parameters:
+    tag (bytes): a single tag, e.g. b' p = reject'
+
+    Returns:
+    tuple: The (name, value), or (None, None) if the tag has no '='
+    """
+    name, separator, value = tag.partition(b'=')
+    if separator == b'':
+        return (None, None)
+    return (name.strip(), value.strip())
+
+def _scan_dmarc(record: bytes) -> bytes:
+    """
+    Validates a DMARC record tag by tag: the version, the policy, then the run of recognized tags that follows
+
+    Parameters:
+    record (bytes): the DMARC record
+
+    Returns:
+    bytes: The record up to the last recognized tag, or None if it is invalid
+    """
+    version, _, rest = record.partition(b';')
+    if _dmarc_tag(version) != (b'v', b'DMARC1'):     # rejects a malformed record before paying to split it
+        return None
+    tags = [version] + rest.split(b';')
+    name, value = _dmarc_tag(tags[1])
+    if name != b'p' or _DMARC_POLICY_RE.fullmatch(value) is None:
+        return None
+    end = 2
+    while end < len(tags):
+        name, value = _dmarc_tag(tags[end])
+        pattern = _DMARC_TAG_RES.get(name)
+        if pattern is None or pattern.fullmatch(value) is None:
+            break
+        end += 1
+    return b';'.join(tags[:end]).rstrip()
+
+def _txt_payload(rdata) -> bytes:
+    """
+    Joins the character-strings of a TXT rdata into one payload, skipping the quoting done by to_text()
+
+    Parameters:
+    rdata (dns.rdata.Rdata): a single record from an answer
+
+    Returns:
+    bytes: The unquoted record data. Records that are not TXT fall back to their text form
+    """
+    strings = getattr(rdata, 'strings', None)
+    if strings is None:
+        return rdata.to_text().encode()
+    return b''.join(strings)
+
+def _starts_with_tag(data: bytes, prefix: bytes) -> bool:
+    """
+    Checks whether raw TXT data starts with a version tag. The SPF tag is matched case-insensitively per RFC 7208, the DKIM and DMARC tags exactly
+
+    Parameters:
+    data (bytes): the record data, or its first character-string
+    prefix (bytes): the version tag
+
+    Returns:
+    bool: True if the data starts with the tag
+    """
+    if prefix == _SPF_PREFIX:
+        return data[:len(prefix)].lower() == prefix
+    return data.startswith(prefix)
+
+def _prefixed_payload(rdata, prefix: bytes) -> bytes:
+    """
+    Returns the joined payload of a TXT rdata only if it starts with the given version tag.
+    Most TXT records at a domain are unrelated (site verification tokens and the like), so the tag is checked against the
+    first character-string before paying for the join.
+
+    Parameters:
+    rdata (dns.rdata.Rdata): a single record from an answer
+    prefix (bytes): the version tag the record must start with
+
+    Returns:
+    bytes: The unquoted record data, or None if the record doesn't start with the prefix
+    """
+    strings = getattr(rdata, 'strings', None)
+    if strings and len(strings[0]) >= len(prefix) and not _starts_with_tag(strings[0], prefix):
+        return None
+    payload = _txt_payload(rdata)     # the tag can only straddle strings if the first one is shorter than it
+    return payload if _starts_with_tag(payload, prefix) else None
+
+def _text_payload(rdata: str) -> bytes:
+    """
+    Normalizes TXT rdata that arrives as text, stripping the quoting if the record was rendered as quoted character-strings
+
+    Parameters:
+    rdata (str): a single TXT record in text form
+
+    Returns:
+    bytes: The unquoted record data
+    """
+    if rdata.startswith('"') and rdata.endswith('"'):
+        rdata = rdata[1:-1].replace('" "', '')
+    return rdata.encode()
+
+def _response_payloads(response: dns.message.Message) -> list:
+    """
+    Pulls the raw TXT payloads for the question out of a response, following any CNAME chain
+
+    Parameters:
+    response (dns.message.Message): the response to a single question query
+
+    Returns:
+    list: The raw payloads (bytes), or None if the response had no answer for the question
+    """
+    try:
+        rrset = response.resolve_chaining().answer
+    except dns.exception.DNSException:
+        return None
+    if rrset is None:
+        return None
+    return [_txt_payload(rdata) for rdata in rrset]
+
+def _sync_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop synchronous callers run their coroutines on, starting it on a daemon thread the first time.
+    The loop outlives each call, so replicated lookups that lost their race still finish and report their round trip time
+    instead of being cancelled when a per-call loop shuts down
+
+    Returns:
+    asyncio.AbstractEventLoop: The shared loop
+    """
+    global _SYNC_LOOP
+    with _SYNC_LOOP_LOCK:
+        if _SYNC_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="dauditor-sync-loop", daemon=True).start()
+            _SYNC_LOOP = loop
+        return _SYNC_LOOP
+
+def _run_sync(coroutine):
+    """
+    Runs a coroutine to completion for a synchronous caller on the shared background loop. This works whether or not the caller is
+    already inside an event loop (a notebook, or an async app using the sync API), since the coroutine never runs on the caller's loop
+
+    Parameters:
+    coroutine (coroutine): the coroutine to run
+
+    Returns:
+    Any: The coroutine's result
+    """
+    loop = _sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("the synchronous API can't be called from a coroutine running on its own loop, await the async API instead")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+def _query_name(text: str):
+    """
+    Parses a query name once up front so the resolver doesn't have to re-parse it on every lookup
+
+    Parameters:
+    text (str): the name to parse
+
+    Returns:
+    dns.name.Name: The parsed name, or the original string if it isn't a valid name so the lookup can report the error
+    """
+    try:
+        return dns.name.from_text(text)
+    except dns.exception.DNSException:
+        return text
+
+def _pinned_resolvers(nameservers: list) -> dict:
+    """
+    Builds one async resolver per nameserver so a query can be replicated across them and raced
+
+    Parameters:
+    nameservers (list): IP addresses of the recursive resolvers to use
+
+    Returns:
+    dict: The resolvers keyed by the nameserver they are pinned to
+    """
+    resolvers = dict()
+    for nameserver in nameservers:
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = [nameserver]
+        resolver.port = 53
+        resolver.timeout = 2.0      # per attempt
+        resolver.lifetime = 5.0     # per lookup, leaving room to resend a lost UDP query while still bounding how long one slow server stalls an audit
+        resolver.use_edns(0, 0, 4096)  # a 4096 byte buffer fits most DKIM keys in one UDP reply instead of truncating to TCP
+        resolvers[nameserver] = resolver
+    return resolvers
+
+async def _resolve_blastdns_batch(names_by_type: dict, nameservers: list, max_inflight: int) -> dict:
+    """
+    Resolves a batch of names with the blastdns client
+
+    Parameters:
+    names_by_type (dict): names to query, keyed by record type
+    nameservers (list): IP addresses of the recursive resolvers to use
+    max_inflight (int): the maximum number of queries in flight at a time
+
+    Returns:
+    dict: Raw TXT payloads keyed by query name. Names that failed or had no records are left out
+    """
+    client = BlastDNSClient(nameservers, BlastDNSConfig(max_concurrency=max_inflight))
+    payloads_by_name = dict()
+    for rdtype, names in names_by_type.items():
+        if len(names) == 0:
+            continue
+        # errors and empty answers are left out of the batch results, so they show up as names with no records
+        async for host, _, answers in client.resolve_batch(names, rdtype):
+            payloads_by_name[host] = [_text_payload(answer) for answer in answers]
+    return payloads_by_name
+
+def _bulk_query(name: str, rdtype: str):
+    """
+    Builds the query the bulk backends send for a name
+
+    Parameters:
+    name (str): the name to query
+    rdtype (str): the record type to query
+
+    Returns:
+    dns.message.QueryMessage: The query, or None if the name doesn't parse
+    """
+    try:
+        # advertise a 4096 byte buffer so long DKIM keys rarely need the TCP fallback
+        return dns.message.make_query(name, rdtype, use_edns=0, payload=4096)
+    except dns.exception.DNSException:
+        return None
+
+def _resolve_udp_batch(names_by_type: dict, nameservers: list, max_inflight: int = 64, timeout: float = 2.0) -> dict:
+    """
+    Resolves a batch of names over raw UDP, multiplexing every outstanding query over one socket per resolver with a single selector.
+    Queries are spread across the resolvers; one that times out or gets SERVFAIL/REFUSED is retried on the next resolver until each has been tried once.
+    Blocks until the whole batch is done.
+
+    Parameters:
+    names_by_type (dict): names to query, keyed by record type
+    nameservers (list): IP addresses of the recursive resolvers to use
+    max_inflight (int): the maximum number of queries in flight at a time
+    timeout (float): seconds to wait for each reply before retrying
+
+    Returns:
+    dict: Raw TXT payloads keyed by query name. Names that failed or had no records are left out
+    """
+    pending = collections.deque()   # (name, query, resolver index, attempt)
+    for rdtype, names in names_by_type.items():
+        for index, name in enumerate(names):
+            query = _bulk_query(name, rdtype)
+            if query is None:
+                continue    # a name that doesn't parse is left out, so it shows up as having no records
+            pending.append((name, query, index % len(nameservers), 0))
+    in_flight = dict()              # (nameserver, query id) -> (name, query, resolver index, attempt, deadline)
+    payloads_by_name = dict()
+    selector = selectors.DefaultSelector()
+    sockets = dict()
+    for nameserver in nameservers:
+        sock = socket.socket(dns.inet.af_for_address(nameserver), socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.connect((nameserver, 53))  # connected, so the kernel drops replies from anyone else
+        selector.register(sock, selectors.EVENT_READ, nameserver)
+        sockets[nameserver] = sock
+
+    def retry(name, query, resolver_index, attempt):
+        if attempt + 1 < len(nameservers):
+            pending.append((name, query, (resolver_index + 1) % len(nameservers), attempt + 1))
+
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_inflight:
+                name, query, resolver_index, attempt = pending.popleft()
+                nameserver = nameservers[resolver_index]
+                while (nameserver, query.id) in in_flight:
+                    query.id = dns.entropy.random_16()
+                try:
+                    sockets[nameserver].send(query.to_wire())
+                except OSError:
+                    retry(name, query, resolver_index, attempt)
+                    continue
+                in_flight[(nameserver, query.id)] = (name, query, resolver_index, attempt, time.monotonic() + timeout)
+            if len(in_flight) == 0:
+                continue
+            wait = max(0.0, min(entry[4] for entry in in_flight.values()) - time.monotonic())
+            for key, _ in selector.select(wait):
+                nameserver = key.data
+                try:
+                    response = dns.message.from_wire(key.fileobj.recv(65535))
+                except (OSError, dns.exception.DNSException):
+                    continue
+                entry = in_flight.get((nameserver, response.id))
+                if entry is None or not entry[1].is_response(response):
+                    continue
+                del in_flight[(nameserver, response.id)]
+                name, query, resolver_index, attempt, _ = entry
+                if response.rcode() in (dns.rcode.SERVFAIL, dns.rcode.REFUSED):
+                    retry(name, query, resolver_index, attempt)
+                    continue
+                if response.flags & dns.flags.TC:
+                    try:
+                        response = dns.query.tcp(query, nameserver, timeout=timeout)
+                    except (OSError, dns.exception.DNSException):
+                        retry(name, query, resolver_index, attempt)
+                        continue
+                payloads = _response_payloads(response)
+                if payloads is not None:
+                    payloads_by_name[name] = payloads
+            now = time.monotonic()
+            for key, (name, query, resolver_index, attempt, deadline) in list(in_flight.items()):
+                if deadline <= now:
+                    del in_flight[key]
+                    retry(name, query, resolver_index, attempt)
+    finally:
+        selector.close()
+        for sock in sockets.values():
+            sock.close()
+    return payloads_by_name
+
+# shared by every dauditor in the process, so resolvers are configured once and cached answers outlive any one audit
+_RESOLVERS = _pinned_resolvers(FAST_RESOLVERS)
+_RESOLVER_RTT = dict.fromkeys(FAST_RESOLVERS, 0.0)     # moving average round trip time in seconds, used to rank the resolvers
+_RESOLVER_SAMPLED = set()                               # resolvers with at least one real round trip time, so their average is no longer the optimistic 0.0 seed
+_CACHE = dns.resolver.LRUCache(max_size=CACHE_SIZE)     # expires each answer by its TTL and is thread-safe
+_NEGATIVE_CACHE = collections.OrderedDict()             # NXDOMAIN results as {cache key: (expiry, error)}, least recently used first. Empty answers are cached in _CACHE
+_NEGATIVE_CACHE_LOCK = threading.Lock()                 # the sync API's loop thread and any caller-owned loop can resolve at the same time
+_PERSISTENT_RESOLVERS = dict()                          # PersistentTCPResolver connections kept open between bulk audits, keyed by backend
+_BACKGROUND_TASKS = set()                               # strong references to fire-and-forget lookups so they aren't garbage collected mid-flight
+_IN_FLIGHT = {nameserver: dict() for nameserver in _RESOLVERS}  # start times of each resolver's outstanding lookups, oldest first
+_RTT_LOCK = threading.Lock()                            # guards _RESOLVER_RTT, _RESOLVER_SAMPLED, and _IN_FLIGHT, which both kinds of loop update
+_SYNC_LOOP = None                                       # event loop the synchronous API runs on, started on first use
+_SYNC_LOOP_LOCK = threading.Lock()
+_AUDIT_CACHE = collections.OrderedDict()                # finished audits as {(target, DKIM names, DKIM type): (expiry, records, results)}, least recently used first
+_AUDIT_CACHE_LOCK = threading.Lock()
+_MULTI_QUESTION_SUPPORT = dict()                        # whether each authoritative nameserver answered a multi-question query, keyed by IP address
+
+def _reset_after_fork() -> None:
+    """
+    Drops the state a forked child inherits from threads that didn't survive the fork: the sync loop whose thread is gone, locks
+    that thread may have been holding, lookups it had in flight, and the persistent connections the parent is still using
+
+    Returns:
+    None
+    """
+    global _SYNC_LOOP, _SYNC_LOOP_LOCK, _NEGATIVE_CACHE_LOCK, _AUDIT_CACHE_LOCK, _RTT_LOCK
+    _SYNC_LOOP = None
+    _SYNC_LOOP_LOCK = threading.Lock()
+    _RTT_LOCK = threading.Lock()
+    _NEGATIVE_CACHE_LOCK = threading.Lock()
+    _AUDIT_CACHE_LOCK = threading.Lock()
+    _BACKGROUND_TASKS.clear()
+    for in_flight in _IN_FLIGHT.values():
+        in_flight.clear()
+    _PERSISTENT_RESOLVERS.clear()
+
+if hasattr(os, "register_at_fork"):     # POSIX only; without fork there is nothing to reset
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _record_rtt(nameserver: str, rtt: float) -> None:
+    """
+    Folds a new round trip time sample into the moving average for a resolver. The first sample replaces the seed outright,
+    since averaging it with 0.0 would make a slow resolver look fast for many lookups
+
+    Parameters:
+    nameserver (str): the resolver the sample was taken from
+    rtt (float): the observed round trip time in seconds
+
+    Returns:
+    None
+    """
+    with _RTT_LOCK:
+        if nameserver not in _RESOLVER_SAMPLED:
+            _RESOLVER_SAMPLED.add(nameserver)
+            _RESOLVER_RTT[nameserver] = rtt
+            return
+        _RESOLVER_RTT[nameserver] += RTT_SMOOTHING * (rtt - _RESOLVER_RTT[nameserver])
+
+def _rtt_estimate(nameserver: str) -> float:
+    """
+    Estimates a resolver's round trip time for ranking. A lookup that has been outstanding for longer than the moving average
+    proves the resolver is at least that slow, so it is demoted as soon as it falls behind rather than once its answer arrives
+
+    Parameters:
+    nameserver (str): the resolver to rank
+
+    Returns:
+    float: The estimated round trip time in seconds
+    """
+    with _RTT_LOCK:
+        oldest = next(iter(_IN_FLIGHT[nameserver].values()), None)
+        average = _RESOLVER_RTT[nameserver]
+    if oldest is None:
+        return average
+    return max(average, time.monotonic() - oldest)
+
+def _cached_nxdomain(cache_key: tuple) -> dns.resolver.NXDOMAIN:
+    """
+    Looks up a name in the negative cache, dropping the entry if it has expired
+
+    Parameters:
+    cache_key (tuple): the (name, record type, class) of the query
+
+    Returns:
+    dns.resolver.NXDOMAIN: The cached error, or None if the name isn't known to be nonexistent
+    """
+    with _NEGATIVE_CACHE_LOCK:
+        negative = _NEGATIVE_CACHE.get(cache_key)
+        if negative is None:
+            return None
+        if negative[0] <= time.monotonic():
+            del _NEGATIVE_CACHE[cache_key]
+            return None
+        _NEGATIVE_CACHE.move_to_end(cache_key)
+        return negative[1]
+
+def _cache_nxdomain(cache_key: tuple, error: dns.resolver.NXDOMAIN) -> None:
+    """
+    Remembers that a name doesn't exist for NEGATIVE_TTL seconds, evicting the least recently used entry once the cache is full
+
+    Parameters:
+    cache_key (tuple): the (name, record type, class) of the query
+    error (dns.resolver.NXDOMAIN): the error to raise for repeat queries
+
+    Returns:
+    None
+    """
+    with _NEGATIVE_CACHE_LOCK:
+        _NEGATIVE_CACHE[cache_key] = (time.monotonic() + NEGATIVE_TTL, error)
+        _NEGATIVE_CACHE.move_to_end(cache_key)
+        if len(_NEGATIVE_CACHE) > CACHE_SIZE:
+            _NEGATIVE_CACHE.popitem(last=False)
+
+def _lookup_expiration(result) -> float:
+    """
+    Works out until when the outcome of a lookup can be reused
+
+    Parameters:
+    result (dns.resolver.Answer | Exception): the answer, or the error the lookup raised
+
+    Returns:
+    float: The wall clock expiry. NXDOMAIN is reusable for NEGATIVE_TTL seconds, any other error not at all
+    """
+    if isinstance(result, dns.resolver.NXDOMAIN):
+        return time.time() + NEGATIVE_TTL
+    if isinstance(result, BaseException):
+        return 0.0
+    return result.expiration
+
+def _cached_audit(cache_key: tuple) -> tuple:
+    """
+    Looks up a finished audit, dropping the entry if any of the answers it was built from has expired
+
+    Parameters:
+    cache_key (tuple): the (target, DKIM query names, DKIM record type) of the audit
+
+    Returns:
+    tuple: The cached (records, results), or None if the audit has to be run again
+    """
+    with _AUDIT_CACHE_LOCK:
+        cached = _AUDIT_CACHE.get(cache_key)
+        if cached is None:
+            return None
+        if cached[0] <= time.time():
+            del _AUDIT_CACHE[cache_key]
+            return None
+        _AUDIT_CACHE.move_to_end(cache_key)
+        return cached[1:]
+
+def _cache_audit(cache_key: tuple, expiration: float, records: tuple, results: dict) -> None:
+    """
+    Remembers a finished audit until the first of its answers expires, evicting the least recently used entry once the cache is full
+
+    Parameters:
+    cache_key (tuple): the (target, DKIM query names, DKIM record type) of the audit
+    expiration (float): the wall clock time the audit stops being valid
+    records (tuple): the (SPF, DKIM, DMARC) records the audit fetched
+    results (dict): the audit results
+
+    Returns:
+    None
+    """
+    if expiration <= time.time():
+        return
+    with _AUDIT_CACHE_LOCK:
+        _AUDIT_CACHE[cache_key] = (expiration, records, results)
+        _AUDIT_CACHE.move_to_end(cache_key)
+        if len(_AUDIT_CACHE) > CACHE_SIZE:
+            _AUDIT_CACHE.popitem(last=False)
+
+def _finish_background_task(task: asyncio.Task) -> None:
+    """
+    Drops the reference to a finished fire-and-forget lookup, discarding its result or error
+
+    Parameters:
+    task (asyncio.Task): the finished lookup
+
+    Returns:
+    None
+    """
+    _BACKGROUND_TASKS.discard(task)
+    if not task.cancelled():
+        task.exception()    # marks the error as retrieved; a failed warm-up is not worth reporting
+
+async def _timed_resolve(nameserver: str, qname: dns.name.Name, rdtype: str) -> dns.resolver.Answer:
+    """
+    Resolves a query against a single resolver and records how long it took. A cancelled lookup records nothing, since the time
+    it ran for says nothing about how long the resolver would have taken
+
+    Parameters:
+    nameserver (str): the resolver to query
+    qname (dns.name.Name): the name to query
+    rdtype (str): the record type to query
+
+    Returns:
+    dns.resolver.Answer: The answer from the resolver, with an rrset of None if the name has no records of that type
+    """
+    start = time.monotonic()
+    token = object()
+    with _RTT_LOCK:
+        _IN_FLIGHT[nameserver][token] = start
+    try:
+        answer = await _RESOLVERS[nameserver].resolve(qname, rdtype, raise_on_no_answer=False)
+    except dns.resolver.NXDOMAIN:
+        _record_rtt(nameserver, time.monotonic() - start)  # still a real answer from the resolver
+        raise
+    except dns.exception.DNSException:
+        _record_rtt(nameserver, _RESOLVERS[nameserver].lifetime)
+        raise
+    finally:
+        with _RTT_LOCK:
+            del _IN_FLIGHT[nameserver][token]
+    _record_rtt(nameserver, time.monotonic() - start)
+    return answer
+
+async def _resolve(qname, rdtype: str) -> dns.resolver.Answer:
+    """
+    Sends the query to the REPLICATION_FACTOR resolvers with the lowest average round trip time and returns whichever answers first.
+    Failed resolvers are ignored while another one is still outstanding. The slower duplicates are left to finish in the background,
+    with their answers discarded, so each resolver's real round trip time is recorded rather than the winner's.
+    Answers, including empty answers and NXDOMAIN, are cached so repeated misses don't go back out to the network.
+
+    Parameters:
+    qname (str | dns.name.Name): the name to query
+    rdtype (str): the record type to query
+
+    Returns:
+    dns.resolver.Answer: The first answer received, with an rrset of None if the name has no records of that type
+    """
+    if not isinstance(qname, dns.name.Name):
+        qname = dns.name.from_text(qname)
+    cache_key = (qname, dns.rdatatype.from_text(rdtype), dns.rdataclass.IN)
+    answer = _CACHE.get(cache_key)
+    if answer is not None:
+        return answer
+    negative = _cached_nxdomain(cache_key)
+    if negative is not None:
+        raise negative.with_traceback(None)
+    fastest = sorted(_RESOLVERS, key=_rtt_estimate)[:REPLICATION_FACTOR]
+    pending = {asyncio.ensure_future(_timed_resolve(nameserver, qname, rdtype)) for nameserver in fastest}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finished = [(task, task.exception()) for task in done]   # retrieves every exception, not just the one raised
+            for task, error in finished:
+                if error is None:
+                    answer = task.result()
+                    _CACHE.put(cache_key, answer)
+                    return answer
+            for task, error in finished:
+                if isinstance(error, dns.resolver.NXDOMAIN):
+                    _cache_nxdomain(cache_key, error)
+                    raise error
+        raise error
+    except asyncio.CancelledError:
+        for task in pending:
+            task.cancel()
+        raise
+    finally:
+        for task in pending:
+            _BACKGROUND_TASKS.add(task)
+            task.add_done_callback(_finish_background_task)
+
+class PersistentTCPResolver():
+    """
+    Resolves batches of queries over one long-lived TCP connection, optionally DNS over TLS, instead of a new socket per query.
+    Queries in a batch are pipelined on the stream and matched back up by query id.
+
+    Attributes:
+    nameserver (str): IP address of the resolver to connect to
+    port (int): 853 for DNS over TLS, otherwise 53
+    timeout (float): seconds to wait for a connection or a batch of responses
+    max_inflight (int): the default maximum number of pipelined queries waiting on a response at a time
+    ssl_context (ssl.SSLContext): the TLS settings, or None for plain TCP
+    server_hostname (str): the name the resolver's certificate is checked against
+
+    Methods:
+    resolve_batch(names_by_type, max_inflight): resolves every name and returns the TXT payloads
+    close(): closes the connection, keeping the TLS session so the next connection can resume it
+    """
+
+    def __init__(self, nameserver: str = "8.8.8.8", tls: bool = False, server_hostname: str = None, timeout: float = 2.0, max_inflight: int = 64):
+        self.nameserver = nameserver
+        self.port = 853 if tls else 53
+        self.timeout = timeout
+        self.max_inflight = max_inflight
+        self.ssl_context = None
+        if tls:
+            self.ssl_context = ssl.create_default_context()
+            self.ssl_context.set_alpn_protocols(['dot'])
+        self.server_hostname = nameserver if server_hostname is None else server_hostname
+        self._sock = None
+        self._tls_session = None    # resumed on reconnect to skip the full handshake
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        """
+        Opens the connection, resuming the previous TLS session if there is one
+
+        Returns:
+        None
+        """
+        sock = socket.create_connection((self.nameserver, self.port), timeout=self.timeout)
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_hostname=self.server_hostname, session=self._tls_session)
+        self._sock = sock
+
+    def close(self) -> None:
+        """
+        Closes the connection, keeping the TLS session so the next connection can resume it
+
+        Returns:
+        None
+        """
+        if self._sock is None:
+            return
+        if self.ssl_context is not None:
+            self._tls_session = self._sock.session
+        self._sock.close()
+        self._sock = None
+
+    def _exchange(self, queries: dict) -> dict:
+        """
+        Pipelines a window of queries on the connection and collects their responses
+
+        Parameters:
+        queries (dict): the queries keyed by query id
+
+        Returns:
+        dict: The responses keyed by query id. Queries still unanswered when the connection fails are left out
+        """
+        responses = dict()
+        expiration = time.time() + self.timeout
+        try:
+            if self._sock is None:
+                self._connect()
+            for query in queries.values():
+                dns.query.send_tcp(self._sock, query, expiration)
+            while len(responses) < len(queries):
+                response, _ = dns.query.receive_tcp(self._sock, expiration)
+                query = queries.get(response.id)
+                if query is not None and query.is_response(response):
+                    responses[response.id] = response
+        except (OSError, EOFError, dns.exception.DNSException):
+            self.close()    # resolvers drop idle connections, so the next window reconnects
+        return responses
+
+    def resolve_batch(self, names_by_type: dict, max_inflight: int = None) -> dict:
+        """
+        Resolves every name over the persistent connection, retrying each unanswered window once on a fresh connection
+
+        Parameters:
+        names_by_type (dict): names to query, keyed by record type
+        max_inflight (int): the maximum number of pipelined queries waiting on a response at a time for this batch. Defaults to the instance's max_inflight
+
+        Returns:
+        dict: Raw TXT payloads keyed by query name. Names that failed or had no records are left out
+        """
+        if max_inflight is None:
+            max_inflight = self.max_inflight
+        pending = [(name, rdtype) for rdtype, names in names_by_type.items() for name in names]
+        payloads_by_name = dict()
+        with self._lock:
+            for start in range(0, len(pending), max_inflight):
+                queries = dict()
+                names_by_id = dict()
+                for name, rdtype in pending[start:start + max_inflight]:
+                    query = _bulk_query(name, rdtype)
+                    if query is None:
+                        continue    # a name that doesn't parse is left out, so it shows up as having no records
+                    while query.id in queries:
+                        query.id = dns.entropy.random_16()
+                    queries[query.id] = query
+                    names_by_id[query.id] = name
+                responses = self._exchange(queries)
+                if len(responses) < len(queries):
+                    responses.update(self._exchange({query_id: query for query_id, query in queries.items() if query_id not in responses}))
+                for query_id, response in responses.items():
+                    payloads = _response_payloads(response)
+                    if payloads is not None:
+                        payloads_by_name[names_by_id[query_id]] = payloads
+        return payloads_by_name
+
+def _make_validator(attribute: str, kind: str, scan) -> collections.abc.Callable:
+    """
+    Builds the validator for a record kind that must have exactly one record, checked by a scanner.
+    The scanner is bound into the validator once instead of being looked up on every call
+
+    Parameters:
+    attribute (str): the dauditor attribute holding the fetched records, e.g. spf_record
+    kind (str): the record kind for error messages, e.g. SPF
+    scan (callable): takes the raw record and returns its validated part (bytes), or None if it is invalid
+
+    Returns:
+    callable: The validator method
+    """
+    invalid = (False, f"ERROR: found {kind} record was invalid")
+
+    def validator(self) -> tuple:
+        records = getattr(self, attribute)
+        count_error = self._record_count_error(records, kind)
+        if count_error is not None:
+            return count_error
+        valid = scan(records[0])
+        if valid is not None:
+            return (True, valid.decode('ascii', 'replace'))
+        return invalid
+
+    validator.__name__ = validator.__qualname__ = f"validate_{kind.lower()}"
+    validator.__doc__ = f"""
+        Scans the previously fetched {kind} record to validate that it is configured correctly.
+        Does not query DNS, so the records must be fetched first
+
+        Returns:
+        tuple: A tuple[bool, str] holding the validated record, or the error on a failed validation
+        """
+    return validator
 
 class dauditor():
     """
@@ -12,33 +835,39 @@ class dauditor():
     target (str): subject of the DNS question
     selectors (str): DKIM selector(s) to go with the domain
     dkim_type (str): name of the record
-    spf_record (list): fetched SPF record for the domain
-    dkim_records (list): fetched DKIM record(s) for the selector + domain
-    dmarc_record (list): fetched DMARC record for the domain
+    spf_record (tuple): fetched SPF record for the domain, as raw bytes
+    dkim_records (tuple): fetched DKIM record(s) for the selector + domain, as raw bytes
+    dmarc_record (tuple): fetched DMARC record for the domain, as raw bytes
 
     Methods:
     change_target(new_target, new_dkim_selector, new_dkim_type): change target and associated DKIM variables, then wipe saved records
-    fetch_spf(): makes a request to the DNS server and parses out the SPF record
-    fetch_dkim(): makes a request to the DNS server and parses out the DKIM record(s)
-    fetch_dmarc(): makes a request to the DNS server and parses out the DMARC record
+    fetch_spf(): (async) makes a request to the DNS server and parses out the SPF record
+    fetch_dkim(): (async) makes a request to the DNS server and parses out the DKIM record(s)
+    fetch_dmarc(): (async) makes a request to the DNS server and parses out the DMARC record
     validate_spf(): validates that the SPF record is configured correctly
     validate_dkim(): validates that the DKIM record is configured correctly
     validate_dmarc(): validates that the DMARC record is configured correctly
-    audit_dns_records(): fetches the SPF, DKIM, and DMARC records, then validates each
+    audit_dns_records_async(): (async) fetches the SPF, DKIM, and DMARC records concurrently, then validates each
+    audit_dns_records(): synchronous wrapper around audit_dns_records_async()
+    preresolve(targets, concurrency): warms the shared cache with the SPF and DMARC answers for a list of domains
+    audit_many_async(targets, dkim_selectors_by_target, dkim_type, concurrency, backend): (async) audits many domains at once, yielding each result as it completes
+    audit_many(targets, dkim_selectors_by_target, dkim_type, concurrency, backend): synchronous wrapper around audit_many_async() that collects every result
     """
-    _resolver = dns.resolver.Resolver()
-    _resolver.nameservers = ['8.8.8.8', '8.8.4.4', '1.1.1.1', '1.0.0.1']
-    _resolver.port = 53
-    spf_record = None
-    dkim_records = None  # one domain can have multiple dkim records if they're on different selectors
-    dmarc_record = None
+    # bulk audits keep thousands of instances alive at once, so they carry no per-instance __dict__
+    __slots__ = ('target', 'selectors', 'dkim_type', 'spf_record', 'dkim_records', 'dmarc_record', '_dmarc_name', '_dkim_suffix', '_expiration')
 
-    def __init__(self, audit_target: str, dkim_selectors: list = [], dkim_record_type: str = "TXT"):
+    def __init__(self, audit_target: str, dkim_selectors: list = None, dkim_record_type: str = "TXT"):
         self.target = audit_target          # domain name to check for the SPF, DKIM, and DMARC records
-        self.selectors = dkim_selectors     # DKIM selectors needed to query
+        self.selectors = [] if dkim_selectors is None else dkim_selectors   # DKIM selectors needed to query
         self.dkim_type = dkim_record_type   # the record type to query for the DKIM
+        self.spf_record = None
+        self.dkim_records = None            # one domain can have multiple dkim records if they're on different selectors
+        self.dmarc_record = None
+        self._dmarc_name = _query_name("_dmarc." + audit_target)
+        self._dkim_suffix = _query_name("_domainkey." + audit_target)
+        self._expiration = float('inf')     # wall clock time the first answer fetched for this target expires
     
-    def change_target(self, new_target: str, new_dkim_selectors: list = [], new_dkim_type: str = "TXT") -> None:
+    def change_target(self, new_target: str, new_dkim_selectors: list = None, new_dkim_type: str = "TXT") -> None:
         """
         Sets new target, selector, and dkim type to 'swap' targets for the object. Clears the fetched recrods
         
@@ -54,166 +883,429 @@ class dauditor():
         self.dkim_records = None
         self.dmarc_record = None
         self.target = new_target
-        self.selectors = new_dkim_selectors
+        self.selectors = [] if new_dkim_selectors is None else new_dkim_selectors
         self.dkim_type = new_dkim_type
+        self._dmarc_name = _query_name("_dmarc." + new_target)
+        self._dkim_suffix = _query_name("_domainkey." + new_target)
+        self._expiration = float('inf')
 
-    def fetch_spf(self) -> list:
+    async def _fetch_txt_with_prefix(self, qname, display_name: str, prefix: bytes, kind: str) -> tuple:
         """
-        Makes a request to the DNS server for the SPF record, parses, then returns it as a list.
-        An empty list is returned if no match is found.
+        Shared fetch path for the single-name TXT records (SPF and DMARC): resolves the name and keeps the records starting with the version tag
+
+        Parameters:
+        qname (str | dns.name.Name): the name to query
+        display_name (str): the name to show in error messages
+        prefix (bytes): the version tag the records must start with
+        kind (str): the record kind for error messages, e.g. SPF
 
         Returns:
-        list: The parsed SPF record(s)
+        tuple: The matching records, or None if the lookup failed
         """
-        self.spf_record = list()
         try:
-            txt_records = self._resolver.resolve(self.target, 'TXT')
+            txt_records = await _resolve(qname, 'TXT')
         except dns.exception.DNSException as error:
-            print(f"FAILED SPF FETCH FOR {self.target} WITH ERROR {error}")
-            return self.spf_record
-        for answer in txt_records.rrset:
-            a = answer.to_text().replace('" "', '') # likely won't need to span multiple strings but still replacing just in case
-            found_spf = re.search(r'v=spf1.+(?=")', a)
-            if found_spf is not None:
-                self.spf_record.append(found_spf.group())
+            self._expiration = min(self._expiration, _lookup_expiration(error))
+            print(f"FAILED {kind} FETCH FOR {display_name} WITH ERROR {error}")
+            return None
+        self._expiration = min(self._expiration, txt_records.expiration)
+        payloads = (_prefixed_payload(answer, prefix) for answer in txt_records.rrset or ())
+        return tuple(payload for payload in payloads if payload is not None)
+
+    async def _fetch_all_records(self) -> bool:
+        """
+        Fast path that asks the target's authoritative nameserver for the SPF, DMARC, and TXT DKIM records in one multi-question packet.
+        Few servers accept more than one question, so the outcome is remembered per nameserver and a refusal falls back to the per-record lookups.
+        Answers that point elsewhere through a CNAME also fall back, since only the per-record lookups follow them
+
+        Returns:
+        bool: True if the records were filled in, False if the per-record lookups are needed
+        """
+        names = [self.target, "_dmarc." + self.target, *self._dkim_query_names()]
+        if self.dkim_type != "TXT" and len(names) > 2:
+            return False
+        try:
+            nameservers = await _resolve(self.target, 'NS')
+            if nameservers.rrset is None:
+                return False
+            addresses = await _resolve(nameservers.rrset[0].target, 'A')
+        except dns.exception.DNSException:
+            return False
+        if addresses.rrset is None:
+            return False
+        nameserver = addresses.rrset[0].address
+        if _MULTI_QUESTION_SUPPORT.get(nameserver) is False:
+            return False
+        try:
+            query_names = {dns.name.from_text(name): name for name in names}
+            query = dns.message.make_query(names[0], 'TXT')
+            for query_name in list(query_names)[1:]:
+                query.find_rrset(query.question, query_name, dns.rdataclass.IN, dns.rdatatype.TXT, create=True, force_unique=True)
+        except dns.exception.DNSException:
+            return False    # a name that doesn't parse is left to the per-record lookups, which report it on its own
+        try:
+            response = await dns.asyncquery.udp(query, nameserver, timeout=2.0)   # raises BadResponse if the questions aren't echoed back
+        except (OSError, dns.exception.DNSException):
+            _MULTI_QUESTION_SUPPORT[nameserver] = False
+            return False
+        if response.rcode() in (dns.rcode.FORMERR, dns.rcode.NOTIMP, dns.rcode.REFUSED):
+            _MULTI_QUESTION_SUPPORT[nameserver] = False
+            return False
+        if response.rcode() != dns.rcode.NOERROR or response.flags & dns.flags.TC:
+            return False
+        _MULTI_QUESTION_SUPPORT[nameserver] = True
+        if any(rrset.rdtype != dns.rdatatype.TXT or rrset.name not in query_names for rrset in response.answer):
+            return False
+        payloads_by_name = collections.defaultdict(list)
+        for rrset in response.answer:
+            payloads_by_name[query_names[rrset.name]].extend(_txt_payload(rdata) for rdata in rrset)
+        ttls = [rrset.ttl for rrset in response.answer]
+        if len(payloads_by_name) < len(query_names):
+            ttls.append(NEGATIVE_TTL)   # names without records carry no TTL here, so they are only trusted for as long as a nonexistent name would be
+        self._expiration = min(self._expiration, time.time() + min(ttls))
+        self._load_payloads(payloads_by_name)
+        return True
+
+    async def fetch_spf(self) -> tuple:
+        """
+        Makes a request to the DNS server for the SPF record, parses, then returns it as a tuple.
+        An empty tuple is returned if no match is found.
+
+        Returns:
+        tuple: The parsed SPF record(s), as raw bytes
+        """
+        self.spf_record = await self._fetch_txt_with_prefix(self.target, self.target, _SPF_PREFIX, "SPF") or tuple()
         return self.spf_record
 
-    def fetch_dkim(self) -> list:
+    def _dkim_query_names(self) -> list:
         """
-        Makes a request to the DNS server for the DKIM record, parses, then returns it as a list.
-        An empty list is returned if no selector is provided or no match is found.
+        Builds the <selector>._domainkey.<target> name for every non-blank selector
 
         Returns:
-        list: The parsed DKIM record(s)
+        list: The DKIM query names
         """
-        if len(self.selectors) == 0:     # DKIM can only be checked if the selector is provided. Potential to add guesses on default names in the future.
-            print("ERROR: no DKIM selectors provided")
-            return []
-        self.dkim_records = list()
-        dkim_domain = "._domainkey." + self.target
+        return [selector.strip() + "._domainkey." + self.target for selector in self.selectors if selector.strip()]
+
+    def _dkim_name_pairs(self) -> list:
+        """
+        Builds every DKIM query name in both text form and as a dns.name.Name, prepending each selector's labels to the _domainkey
+        suffix that was parsed once per target, so the resolver doesn't have to parse every full name
+
+        Returns:
+        list: (text name, query name) pairs, the query name being the text form instead if it isn't a valid name so the lookup can report the error
+        """
+        pairs = []
         for selector in self.selectors:
-            query_name = selector + dkim_domain
-            try:
-                dns_record = self._resolver.resolve(query_name, self.dkim_type)
-            except dns.exception.DNSException as error:
-                print(f"FAILED DKIM FETCH FOR {query_name} WITH ERROR {error}")
+            selector = selector.strip()
+            if not selector:
                 continue
-            for answer in dns_record.rrset:
-                a = answer.to_text().replace('" "', '') # replace is required as the record is usually long enough to span multiple sections
-            found_dkim = re.search(r'v=DKIM1.+(?=")', a)
-            if found_dkim is not None:
-                self.dkim_records.append(found_dkim.group())
-            if len(self.dkim_records) == 0:
-                print(f"DKIM FETCHED FOR {query_name} BUT HAD NO DATA")
+            text_name = selector + "._domainkey." + self.target
+            qname = text_name
+            if isinstance(self._dkim_suffix, dns.name.Name):
+                try:
+                    qname = dns.name.Name(tuple(selector.encode('ascii').split(b'.')) + self._dkim_suffix.labels)
+                except (UnicodeError, dns.exception.DNSException):
+                    pass
+            pairs.append((text_name, qname))
+        return pairs
+
+    def _load_payloads(self, payloads_by_name: dict) -> None:
+        """
+        Fills in the SPF, DKIM, and DMARC records from TXT payloads that were resolved in bulk outside of the fetch methods
+
+        Parameters:
+        payloads_by_name (dict): raw TXT payloads (bytes) keyed by the name they were queried for. Missing names are treated as having no records
+
+        Returns:
+        None
+        """
+        self.spf_record = tuple(payload for payload in payloads_by_name.get(self.target, ()) if _starts_with_tag(payload, _SPF_PREFIX))
+        self.dkim_records = tuple(payload for query_name in self._dkim_query_names() for payload in payloads_by_name.get(query_name, ()) if payload.startswith(_DKIM_PREFIX))
+        self.dmarc_record = tuple(payload for payload in payloads_by_name.get("_dmarc." + self.target, ()) if payload.startswith(_DMARC_PREFIX))
+
+    async def fetch_dkim(self) -> tuple:
+        """
+        Makes a request to the DNS server for the DKIM record, parses, then returns it as a tuple.
+        An empty tuple is returned if no selector is provided or no match is found.
+
+        Returns:
+        tuple: The parsed DKIM record(s), as raw bytes
+        """
+        name_pairs = self._dkim_name_pairs()
+        if len(name_pairs) == 0:     # DKIM can only be checked if the selector is provided. Potential to add guesses on default names in the future.
+            print("ERROR: no DKIM selectors provided")
+            self.dkim_records = tuple()
+            return self.dkim_records
+        # every selector is its own owner name, so the lookups are fanned out rather than awaited one at a time
+        semaphore = asyncio.Semaphore(DKIM_CONCURRENCY)
+
+        async def lookup(qname) -> dns.resolver.Answer:
+            async with semaphore:
+                return await _resolve(qname, self.dkim_type)
+
+        dns_records = await asyncio.gather(*(lookup(qname) for _, qname in name_pairs), return_exceptions=True)
+        self.dkim_records = tuple(
+            record for (query_name, _), dns_record in zip(name_pairs, dns_records) for record in self._dkim_records_for(query_name, dns_record)
+        )
         return self.dkim_records
 
-    def fetch_dmarc(self) -> list:
+    def _dkim_records_for(self, query_name: str, dns_record) -> list:
+        """
+        Pulls the DKIM records out of the lookup for a single selector, reporting a failed or empty lookup without affecting the other selectors
+
+        Parameters:
+        query_name (str): the name that was queried
+        dns_record (dns.resolver.Answer | Exception): the answer, or the error the lookup raised
+
+        Returns:
+        list: The DKIM records (bytes) found for the selector
         """
-        Makes a request to the DNS server for the DMARC record, parses, then returns it as a list.
-        An empty list is returned if no match is found.
+        self._expiration = min(self._expiration, _lookup_expiration(dns_record))
+        if isinstance(dns_record, dns.exception.DNSException):
+            print(f"FAILED DKIM FETCH FOR {query_name} WITH ERROR {dns_record}")
+            return []
+        if isinstance(dns_record, BaseException):
+            raise dns_record
+        # the key is usually long enough to span multiple strings
+        payloads = (_prefixed_payload(answer, _DKIM_PREFIX) for answer in dns_record.rrset or ())
+        found = [payload for payload in payloads if payload is not None]
+        if len(found) == 0:
+            print(f"DKIM FETCHED FOR {query_name} BUT HAD NO DATA")
+        return found
+
+    async def fetch_dmarc(self) -> tuple:
+        """
+        Makes a request to the DNS server for the DMARC record, parses, then returns it as a tuple.
+        An empty tuple is returned if no match is found.
 
         Returns:
-        list: The parsed DMARC record(s)
+        tuple: The parsed DMARC record(s), as raw bytes
         """
-        self.dmarc_record = list()
-        dmarc_domain = "_dmarc." + self.target
-        try:
-            txt_records = self._resolver.resolve(dmarc_domain, 'TXT')
-        except dns.exception.DNSException as error:
-            print(f"FAILED DMARC FETCH FOR {dmarc_domain} WITH ERROR {error}")
-            return self.dmarc_record
-        for answer in txt_records.rrset:
-            a = answer.to_text().replace('" "', '') # replace is required as the record is usually long enough to span multiple sections
-            found_dmarc = re.search(r'v=DMARC1.+(?=")', a)
-            if found_dmarc is not None:
-                self.dmarc_record.append(found_dmarc.group())
-        if len(self.dmarc_record) == 0:
-            print(f"DMARC FETCHED FOR {dmarc_domain} BUT HAD NO DATA")
-            return self.dmarc_record
-        if self.dmarc_record[0][0:10] == 'v=DMARC1;"':
-            self.dmarc_record[0] = self.dmarc_record[0].replace('" "', ' ')
+        fetched = await self._fetch_txt_with_prefix(self._dmarc_name, "_dmarc." + self.target, _DMARC_PREFIX, "DMARC")
+        self.dmarc_record = fetched or tuple()
+        if fetched is not None and len(fetched) == 0:
+            print(f"DMARC FETCHED FOR _dmarc.{self.target} BUT HAD NO DATA")
         return self.dmarc_record
 
-    def validate_spf(self) -> tuple:
+    @staticmethod
+    def _record_count_error(fetched: tuple, kind: str) -> tuple:
         """
-        Uses a regex pattern for a properly configured SPF record to validate that the previously fetched record matches the pattern
+        Checks that exactly one record of a kind was fetched. Works purely from the in-memory records and never queries DNS
+
+        Parameters:
+        fetched (tuple): the previously fetched records, or None if they were never fetched
+        kind (str): the record kind for the error message, e.g. SPF
 
         Returns:
-        tuple: Either a tuple[bool, list] or a tuple[bool, str] on a failed validation
+        tuple: A tuple[bool, str] failed validation if there isn't exactly one record, otherwise None
         """
-        if self.spf_record is None:
-            self.fetch_spf()
-        if len(self.spf_record) == 0:
-            return (False, "ERROR: no SPF record was found")
-        elif len(self.spf_record) >= 2:
-            return (False, "ERROR: multiple SPF records found")
-        # https://datatracker.ietf.org/doc/html/rfc7208#section-4.6.1
-        spf_pattern = re.compile(r'^v=spf1((\s[-~+?]?ip4:\d{1,3}(\.\d{1,3}){3}(/\d{1,2})?)|(\s[-~+?]?ip6:[\da-fA-F:]+(/\d{1,2})?)|(\s[-~+?]?a(:([\w-]+\.)+[\w-]+)?)|(\s[-~+?]?mx(:([\w-]+\.)+[\w-]+)?)|(\s[-~+?]?include:([\w-]+\.)+[\w-]+)|(\sredirect=([\w-]+)[\.\w-]+)|(\sexp=([\w-]+)[\.\w-]+)|(\s[-~+?]?exists:[\S]+)|(\s[\w.-]+=[\S]+))*(\s[-~+?]all)')
-        valid_spf = re.match(spf_pattern, self.spf_record[0])
-        if valid_spf is not None:
-            return (True, valid_spf.group())
-        return (False, "ERROR: found SPF record was invalid")
+        if not fetched:
+            return (False, f"ERROR: no {kind} record was found")
+        elif len(fetched) >= 2:
+            return (False, f"ERROR: multiple {kind} records found")
+        return None
+
+    validate_spf = _make_validator('spf_record', "SPF", _scan_spf)
 
     def validate_dkim(self) -> tuple:
         """
-        Uses a regex pattern for a properly configured DKIM record to validate that the previously fetched records match the pattern
-
-        Returns:
-        tuple: Either a tuple[bool, list] or a tuple[bool, str] on a failed validation
-        """
-        if self.dkim_records is None:
-            self.fetch_dkim()
-        if len(self.dkim_records) == 0:
-            return (False, "ERROR: no DKIM record was found")
-        elif len(self.dkim_records) >= 2:
-            # need to fix logic for checking that it's 1 to 1 on selectors and records
-            return (False, "ERROR: multiple DKIM records found on the same selector")
-        # https://datatracker.ietf.org/doc/html/rfc6376/
-        dkim_pattern = re.compile(r'^v\s*=\s*DKIM1((\s*;\s*k\s*=\s*[\w:]+)|(\s*;\s*p\s*=\s*[\w+/]+=*)|(\s*;\s*s\s*=\s*([\w:]+|\*))|(\s*;\s*h\s*=\s*[\w:]+)|(\s*;\s*t\s*=\s*[\w]+)|(\s*;\s*n\s*=\s*[\w\s]+))+\s*;?')
-        valid_records = list()
-        for dkim_record in self.dkim_records:
-            valid_dkim = re.match(dkim_pattern, dkim_record)
-            if valid_dkim is not None:
-                valid_records.append(valid_dkim.group())
+        Uses a regex pattern for a properly configured DKIM record to validate that the previously fetched records match the pattern.
+        Does not query DNS, so the records must be fetched first
+
+        Returns:
+        tuple: Either a tuple[bool, tuple] or a tuple[bool, str] on a failed validation
+        """
+        count_error = self._record_count_error(self.dkim_records, "DKIM")  # need to fix logic for checking that it's 1 to 1 on selectors and records
+        if count_error is not None:
+            return count_error
+        valid_records = tuple(valid_dkim.group().decode('ascii', 'replace') for valid_dkim in (_DKIM_VALIDATE_RE.match(dkim_record) for dkim_record in self.dkim_records) if valid_dkim is not None)
         if len(valid_records) > 0:
             return (True, valid_records)
         return (False, "ERROR: found DKIM records were invalid")
 
-    def validate_dmarc(self) -> tuple:
+    validate_dmarc = _make_validator('dmarc_record', "DMARC", _scan_dmarc)
+
+    async def audit_dns_records_async(self) -> dict:
+        """
+        Consolidates the functionality for fetching and checking the SPF and DMARC records, along with the DKIM record if DKIM selector is provided.
+        The three lookups are independent, so they are issued concurrently and the audit takes roughly one round trip instead of three.
+        An NS lookup for the target is fired alongside them so the upstream resolvers pick up the zone's delegation, which the
+        _dmarc and _domainkey names under it share. With MULTI_QUESTION_QUERIES set, the target's nameserver is first asked for
+        every record in one packet.
+        A finished audit is reused, without querying DNS, until the first answer it was built from expires.
+
+        Returns:
+        dict: The validate_spf(), validate_dkim(), and validate_dmarc() results, keyed by SPF, DKIM, and DMARC
+        """
+        cache_key = (self.target, frozenset(self._dkim_query_names()), self.dkim_type)
+        cached = _cached_audit(cache_key)
+        if cached is not None:
+            (self.spf_record, self.dkim_records, self.dmarc_record), results = cached
+            return dict(results)
+        self._expiration = float('inf')
+        if MULTI_QUESTION_QUERIES and await self._fetch_all_records():
+            results = self._validated_results()
+            _cache_audit(cache_key, self._expiration, (self.spf_record, self.dkim_records, self.dmarc_record), results)
+            return dict(results)
+        warm_up = asyncio.ensure_future(_resolve(self.target, 'NS'))
+        _BACKGROUND_TASKS.add(warm_up)
+        warm_up.add_done_callback(_finish_background_task)
+        fetched = await asyncio.gather(self.fetch_spf(), self.fetch_dkim(), self.fetch_dmarc(), return_exceptions=True)
+        fetched_spf_record, fetched_dkim_records, fetched_dmarc_record = [
+            tuple() if isinstance(records, Exception) else records for records in fetched
+        ]
+        for name, records in zip(("SPF", "DKIM", "DMARC"), fetched):
+            if isinstance(records, Exception):
+                print(f"FAILED {name} FETCH FOR {self.target} WITH ERROR {records}")
+                self._expiration = 0.0
+        self.spf_record = fetched_spf_record
+        self.dkim_records = fetched_dkim_records
+        self.dmarc_record = fetched_dmarc_record
+        results = self._validated_results()
+        _cache_audit(cache_key, self._expiration, (self.spf_record, self.dkim_records, self.dmarc_record), results)
+        return dict(results)
+
+    def _validated_results(self) -> dict:
         """
-        Uses a regex pattern for a properly configured DMARC record to validate that the previously fetched record matches the pattern
+        Validates the records that have already been fetched. A valid result already carries the validated record, and the raw
+        records stay available on spf_record, dkim_records, and dmarc_record, so they aren't copied into the results
 
         Returns:
-        tuple: Either a tuple[bool, list] or a tuple[bool, str] on a failed validation
+        dict: The validate_spf(), validate_dkim(), and validate_dmarc() results, keyed by SPF, DKIM, and DMARC
         """
-        if self.dmarc_record is None:
-            self.fetch_dmarc()
-        if len(self.dmarc_record) == 0:
-            return (False, "ERROR: no DMARC record was found")
-        elif len(self.dmarc_record) >= 2:
-            return (False, "ERROR: multiple DKIM records found on the same selector")
-        # https://datatracker.ietf.org/doc/html/rfc7489#section-6.4
-        dmarc_pattern = re.compile(r"^v\s*=\s*DMARC1\s*;\s*p\s*=\s*(none|quarantine|reject)((\s*;\s*sp\s*=\s*(none|quarantine|reject))|(\s*;\s*rua\s*=\s*([^;]*))|(\s*;\s*ruf\s*=\s*([^;]+))|(\s*;\s*adkim\s*=\s*[rs])|(\s*;\s*aspf\s*=\s*[rs])|(\s*;\s*ri\s*=\s*\d+)|(\s*;\s*fo\s*=\s*[01ds](\s*:\s*[01ds])*)|(\s*;\s*rf\s*=\s*[a-zA-Z]+)|(\s*;\s*pct\s*=\s*[\d]{3}))*")
-        valid_dmarc = re.match(dmarc_pattern, self.dmarc_record[0])
-        if valid_dmarc is not None:
-            return (True, valid_dmarc.group())
-        return (False, "ERROR: found DMARC record was invalid")
+        return {"SPF": self.validate_spf(), "DKIM": self.validate_dkim(), "DMARC": self.validate_dmarc()}
 
     def audit_dns_records(self) -> dict:
         """
-        Consolidates the functionality for fetching and checking the SPF and DMARC records, along with the DKIM record if DKIM selector is provided.
+        Synchronous entry point for audit_dns_records_async(), safe to call whether or not an event loop is already running
 
         Returns:
-        dict: A dict of tuples with the [boolean result of validation, found record] for each record
+        dict: The validate_spf(), validate_dkim(), and validate_dmarc() results, keyed by SPF, DKIM, and DMARC
         """
-        fetched_spf_record = self.fetch_spf()
-        fetched_dkim_records = self.fetch_dkim()
-        fetched_dmarc_record = self.fetch_dmarc()
-        
-        results = {
-            "SPF": (self.validate_spf(), fetched_spf_record),
-            "DKIM": (self.validate_dkim(), fetched_dkim_records),
-            "DMARC": (self.validate_dmarc(), fetched_dmarc_record)
-        }
-        return results
+        return _run_sync(self.audit_dns_records_async())
+
+    @classmethod
+    async def _preresolve_async(cls, targets: list, concurrency: int) -> None:
+        """
+        Resolves the SPF and DMARC names of every domain so the answers land in the shared cache
+
+        Parameters:
+        targets (list): domain names to warm the cache for
+        concurrency (int): the maximum number of queries in flight at a time
 
+        Returns:
+        None
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(query_name: str) -> None:
+            async with semaphore:
+                try:
+                    await _resolve(query_name, 'TXT')
+                except dns.exception.DNSException:
+                    pass    # NXDOMAIN is cached either way, and timeouts are left for the audit to retry and report
+
+        await asyncio.gather(*(warm(query_name) for target in targets for query_name in (target, "_dmarc." + target)))
+
+    @classmethod
+    def preresolve(cls, targets: list, concurrency: int = 256) -> None:
+        """
+        Warms the shared cache with the SPF and DMARC answers for a list of domains that is known up front, so the audits that follow
+        are served from the cache instead of waiting on cold lookups
+
+        Parameters:
+        targets (list): domain names to warm the cache for
+        concurrency (int): the maximum number of queries in flight at a time
+
+        Returns:
+        None
+        """
+        _run_sync(cls._preresolve_async(targets, concurrency))
+
+    @classmethod
+    async def audit_many_async(cls, targets: list, dkim_selectors_by_target: dict = None, dkim_type: str = "TXT", concurrency: int = 256, backend: str = "dnspython"):
+        """
+        Audits many domains on one event loop, with at most `concurrency` audits in flight at a time.
+        Every audit shares the class-level resolvers and caches. Results are yielded as they complete, not in input order.
+
+        Parameters:
+        targets (list): domain names to audit
+        dkim_selectors_by_target (dict): DKIM selectors for each domain name. Domains without an entry skip DKIM
+        dkim_type (str): the type of record to query for the DKIM records
+        concurrency (int): the maximum number of audits in flight at a time, at least 1
+        backend (str): "dnspython", "udp" to resolve the whole batch over raw multiplexed UDP, "tcp" or "tls" to pipeline it over one persistent
+                       TCP or DNS over TLS connection, or "blastdns" to resolve it with the blastdns package. blastdns falls back to dnspython if it isn't installed
+
+        Yields:
+        tuple: The (domain name, audit_dns_records_async() result) of each audit
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        if dkim_selectors_by_target is None:
+            dkim_selectors_by_target = dict()
+        if backend == "blastdns" and BlastDNSClient is None:
+            print("BLASTDNS IS NOT INSTALLED, FALLING BACK TO DNSPYTHON")
+            backend = "dnspython"
+        if backend in ("udp", "tcp", "tls", "blastdns"):
+            async for result in cls._audit_many_bulk(targets, dkim_selectors_by_target, dkim_type, concurrency, backend):
+                yield result
+            return
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def audit_one(target: str) -> tuple:
+            async with semaphore:
+                auditor = cls(target, dkim_selectors_by_target.get(target), dkim_type)
+                return (target, await auditor.audit_dns_records_async())
+
+        for audit in asyncio.as_completed([audit_one(target) for target in targets]):
+            yield await audit
+
+    @classmethod
+    def audit_many(cls, targets: list, dkim_selectors_by_target: dict = None, dkim_type: str = "TXT", concurrency: int = 256, backend: str = "dnspython") -> dict:
+        """
+        Synchronous entry point for audit_many_async(), for bulk scans of a list of domains
+
+        Parameters:
+        targets (list): domain names to audit
+        dkim_selectors_by_target (dict): DKIM selectors for each domain name. Domains without an entry skip DKIM
+        dkim_type (str): the type of record to query for the DKIM records
+        concurrency (int): the maximum number of audits in flight at a time, at least 1
+        backend (str): the resolution backend, see audit_many_async()
+
+        Returns:
+        dict: The audit_dns_records() result of each domain, keyed by domain name
+        """
+        async def collect() -> dict:
+            return {target: result async for target, result in cls.audit_many_async(targets, dkim_selectors_by_target, dkim_type, concurrency, backend)}
+
+        return _run_sync(collect())
+
+    @classmethod
+    async def _audit_many_bulk(cls, targets: list, dkim_selectors_by_target: dict, dkim_type: str, concurrency: int, backend: str):
+        """
+        Resolves every SPF, DKIM, and DMARC name for the batch in one go, then validates each domain from the results
+
+        Parameters:
+        targets (list): domain names to audit
+        dkim_selectors_by_target (dict): DKIM selectors for each domain name
+        dkim_type (str): the type of record to query for the DKIM records
+        concurrency (int): the maximum number of queries in flight at a time
+        backend (str): "udp", "tcp", "tls", or "blastdns"
+
+        Yields:
+        tuple: The (domain name, audit result) of each audit
+        """
+        auditors = [cls(target, dkim_selectors_by_target.get(target), dkim_type) for target in targets]
+        names_by_type = {"TXT": [name for auditor in auditors for name in (auditor.target, "_dmarc." + auditor.target)]}
+        names_by_type.setdefault(dkim_type, []).extend(name for auditor in auditors for name in auditor._dkim_query_names())
+        if backend == "blastdns":
+            payloads_by_name = await _resolve_blastdns_batch(names_by_type, FAST_RESOLVERS, concurrency)
+        elif backend in ("tcp", "tls"):
+            if backend not in _PERSISTENT_RESOLVERS:
+                _PERSISTENT_RESOLVERS[backend] = PersistentTCPResolver(FAST_RESOLVERS[0], tls=backend == "tls")
+            payloads_by_name = await asyncio.to_thread(_PERSISTENT_RESOLVERS[backend].resolve_batch, names_by_type, concurrency)
+        else:
+            payloads_by_name = await asyncio.to_thread(_resolve_udp_batch, names_by_type, FAST_RESOLVERS, concurrency)
+        for auditor in auditors:
+            auditor._load_payloads(payloads_by_name)
+            yield (auditor.target, auditor._validated_results())